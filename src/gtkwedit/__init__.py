@@ -1,8 +1,11 @@
-from collections.abc import Sequence
+import io
+from collections.abc import Callable, Sequence
+from contextlib import AbstractContextManager
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Final, Generic, Optional, TypeAlias, TypedDict, TypeVar
+from typing import Any, Final, Generic, Optional, TypeAlias, TypedDict, TypeVar
+from weakref import WeakKeyDictionary
 
 from typing_extensions import NotRequired, Unpack
 from vcd.gtkw import GTKWColor as Color, GTKWFlag, GTKWSave
@@ -10,6 +13,16 @@ from vcd.gtkw import GTKWColor as Color, GTKWFlag, GTKWSave
 T = TypeVar("T", bound="Trace | NestedTrace")
 
 
+def _as_children(
+    children: "Sequence[AnyTrace] | AnyTrace",
+) -> tuple[Any, ...]:
+    """Normalize single child/sequence of children to a tuple"""
+    # `str` is a sequence too, but denotes a single (implicit) signal
+    if isinstance(children, str) or not isinstance(children, Sequence):
+        return (children,)
+    return tuple(children)
+
+
 class DataFmt(Enum):
     """Trace display data format"""
     HEX = "hex"
@@ -53,6 +66,9 @@ class Styled(Generic[T]):
     style: Style
     """Trace style"""
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "children", _as_children(self.children))
+
 
 @dataclass(frozen=True)
 class Signal:
@@ -77,6 +93,9 @@ class Submodule(Generic[T]):
     children: Sequence[T] | T
     style: Optional[Style] = None
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "children", _as_children(self.children))
+
 
 @dataclass(frozen=True)
 class Group:
@@ -93,6 +112,9 @@ class Group:
     style: Optional[Style] = None
     """Group trace style"""
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "children", _as_children(self.children))
+
 
 @dataclass(frozen=True)
 class Blank:
@@ -125,80 +147,274 @@ AnyTrace: TypeAlias = NestedTrace | Trace
 _ROOT_STYLE: Final[RootStyle] = RootStyle(datafmt=DataFmt.HEX, rjustify=True)
 
 
-def _merge_path(parent: Optional[str], own: str) -> str:
-    if parent is not None:
-        return f"{parent}.{own}"
-    else:
-        return own
+@dataclass(frozen=True, slots=True)
+class _ResolvedStyle:
+    """Fully resolved trace style (as passed to `GTKWSave.trace`)"""
+    color: Optional[Color]
+    """Trace color"""
+    datafmt: str
+    """Trace data format value"""
+    rjustify: bool
+    """Right justify displayed trace data?"""
+    extraflags: GTKWFlag
+    """Extra flags"""
+
+    @classmethod
+    def from_root(cls, style: RootStyle) -> "_ResolvedStyle":
+        # `GTKWSave.trace` treats non-`GTKWFlag` extraflags (incl. `None`) as the
+        # deprecated string sequence form and warns on every call
+        return cls(
+            style.get("color"),
+            style.get("datafmt").value,
+            style.get("rjustify"),
+            style.get("extraflags") or GTKWFlag.none,
+        )
+
+    def merge(self, own: Style) -> "_ResolvedStyle":
+        """Override fields specified by `own` style"""
+        return _ResolvedStyle(
+            own.get("color", self.color),
+            own["datafmt"].value if "datafmt" in own else self.datafmt,
+            own.get("rjustify", self.rjustify),
+            own.get("extraflags", self.extraflags) or GTKWFlag.none,
+        )
+
+
+_MergeCache: TypeAlias = dict[
+    tuple[int, int], tuple[_ResolvedStyle, Style, _ResolvedStyle]
+]
+"""Merged styles keyed by `(id(parent), id(own))`, value is (parent, own, merged)"""
+
+
+def _merge_style(
+    parent: _ResolvedStyle, own: Optional[Style], cache: _MergeCache
+) -> _ResolvedStyle:
+    if own is None:
+        return parent
 
+    # Styles are shared between many nodes, merge each (parent, own) pair once.
+    # `id()` is only unique among live objects, so the entry holds references
+    # to both key objects; they cannot be freed (and their ids reused) while
+    # the cache lives, i.e. until `write_gtkw_file` returns.
+    key = (id(parent), id(own))
+    entry = cache.get(key)
+    if entry is not None and entry[0] is parent and entry[1] is own:
+        return entry[2]
 
-def _merge_style(parent: RootStyle, own: Optional[Style]) -> RootStyle:
-    if own is not None:
-        return parent | own  # type: ignore
-    else:
-        return parent
+    merged = parent.merge(own)
+    cache[key] = (parent, own, merged)
+    return merged
+
+
+class _GroupEnd:
+    """Stack marker closing an open group once all its children are emitted"""
+    __slots__ = ("ctx",)
+
+    def __init__(self, ctx: AbstractContextManager[None]) -> None:
+        self.ctx = ctx
+
+
+class _LeafCtx:
+    """Context inherited by all children of a node (style and path prefix)"""
+    __slots__ = ("style", "path_prefix")
+
+    def __init__(self, style: _ResolvedStyle, path_prefix: str) -> None:
+        self.style = style
+        # Paths are built as `prefix + name`, prefix being "" or "parent.path."
+        self.path_prefix = path_prefix
+
+
+_Frame: TypeAlias = tuple[Any, _LeafCtx]
+"""Pending work item: (node, inherited context)"""
+
+
+def _push_children(
+    stack: list[_Frame], children: Sequence[AnyTrace] | AnyTrace, ctx: _LeafCtx
+) -> None:
+    # Children are normalized to a tuple on construction (see `_as_children`),
+    # pushed in reverse so that they are popped in declaration order
+    stack.extend([(child, ctx) for child in reversed(children)])  # type: ignore
 
 
 def _traverse_dom(
     save: GTKWSave,
     dom: Sequence[AnyTrace] | AnyTrace,
-    parent_style: RootStyle,
-    parent_path: Optional[str],
+    root_style: RootStyle,
+    root_path: Optional[str],
+    merge_cache: _MergeCache,
+) -> None:
+    # Held for the whole traversal: merged styles derived from it are cached
+    # by `id()` (see `_merge_style`)
+    resolved_root_style = _ResolvedStyle.from_root(root_style)
+    root_ctx = _LeafCtx(
+        resolved_root_style, "" if root_path is None else root_path + "."
+    )
+    stack: list[_Frame] = []
+    _push_children(stack, _as_children(dom), root_ctx)
+
+    # Bind per-node lookups once
+    pop = stack.pop
+    get_handler = _HANDLERS.get
+    while stack:
+        item, ctx = pop()
+        handler = get_handler(type(item)) or _lookup_handler(type(item))
+        if handler is not None:
+            handler(stack, save, item, ctx, merge_cache)
+
+
+def _h_comment(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: Comment,
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
 ) -> None:
-    if not isinstance(dom, Sequence):
-        dom = [dom]
-
-    for item in dom:
-        match item:
-            case Comment(comment, analog_extend, highlight):
-                save.blank(comment, analog_extend, highlight)
-
-            case Blank(analog_extend, highlight):
-                save.blank(analog_extend=analog_extend, highlight=highlight)
-
-            case Group(name, children, closed, highlight, style):
-                style = _merge_style(parent_style, style)
-                with save.group(name, closed, highlight):
-                    _traverse_dom(save, children, style, parent_path)
-
-            case Submodule(name, children, style):
-                style = _merge_style(parent_style, style)
-                _traverse_dom(save, children, style, _merge_path(parent_path, name))
-
-            case Signal(
-                name,
-                alias,
-                highlight,
-                style,
-                translate_filter_file,
-                translate_filter_process,
-            ):
-                style = _merge_style(parent_style, style)
-                save.trace(
-                    _merge_path(parent_path, name),
-                    alias,
-                    style.get("color"),
-                    style.get("datafmt").value,
-                    highlight,
-                    style.get("rjustify"),
-                    style.get("extraflags"),
-                    translate_filter_file,
-                    translate_filter_process,
-                )
-
-            case Styled(children, style):
-                style = _merge_style(parent_style, style)
-                _traverse_dom(save, children, style, parent_path)
-
-            # Implicit signal name
-            case str():
-                save.trace(
-                    _merge_path(parent_path, item),
-                    color=parent_style.get("color"),
-                    datafmt=parent_style.get("datafmt").value,
-                    rjustify=parent_style.get("rjustify"),
-                    extraflags=parent_style.get("extraflags"),
-                )
+    save.blank(item.comment, item.analog_extend, item.highlight)
+
+
+def _h_blank(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: Blank,
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
+) -> None:
+    save.blank(analog_extend=item.analog_extend, highlight=item.highlight)
+
+
+def _h_group(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: Group,
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
+) -> None:
+    if item.style is not None:
+        ctx = _LeafCtx(
+            _merge_style(ctx.style, item.style, merge_cache), ctx.path_prefix
+        )
+    group_ctx = save.group(item.name, item.closed, item.highlight)
+    group_ctx.__enter__()
+    stack.append((_GroupEnd(group_ctx), ctx))
+    _push_children(stack, item.children, ctx)
+
+
+def _h_group_end(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: _GroupEnd,
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
+) -> None:
+    item.ctx.__exit__(None, None, None)
+
+
+def _h_submodule(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: Submodule[AnyTrace],
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
+) -> None:
+    _push_children(
+        stack,
+        item.children,
+        _LeafCtx(
+            _merge_style(ctx.style, item.style, merge_cache),
+            ctx.path_prefix + item.name + ".",
+        ),
+    )
+
+
+def _h_signal(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: Signal,
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
+) -> None:
+    style = _merge_style(ctx.style, item.style, merge_cache)
+    save.trace(
+        ctx.path_prefix + item.name,
+        item.alias,
+        style.color,
+        style.datafmt,
+        item.highlight,
+        style.rjustify,
+        style.extraflags,
+        item.translate_filter_file,
+        item.translate_filter_process,
+    )
+
+
+def _h_styled(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: Styled[AnyTrace],
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
+) -> None:
+    _push_children(
+        stack,
+        item.children,
+        _LeafCtx(_merge_style(ctx.style, item.style, merge_cache), ctx.path_prefix),
+    )
+
+
+def _h_str(
+    stack: list[_Frame],
+    save: GTKWSave,
+    item: str,
+    ctx: _LeafCtx,
+    merge_cache: _MergeCache,
+) -> None:
+    """Implicit signal name"""
+    style = ctx.style
+    save.trace(
+        ctx.path_prefix + item,
+        color=style.color,
+        datafmt=style.datafmt,
+        rjustify=style.rjustify,
+        extraflags=style.extraflags,
+    )
+
+
+_Handler: TypeAlias = Callable[
+    [list[_Frame], GTKWSave, Any, _LeafCtx, _MergeCache], None
+]
+
+# Dispatch on exact node type (cheaper than structural `match`)
+_HANDLERS: Final[dict[type, _Handler]] = {
+    Comment: _h_comment,
+    Blank: _h_blank,
+    Group: _h_group,
+    _GroupEnd: _h_group_end,
+    Submodule: _h_submodule,
+    Signal: _h_signal,
+    Styled: _h_styled,
+    str: _h_str,
+}
+
+
+# Weak keys so that runtime-created node subclasses can still be collected
+_SUBCLASS_HANDLERS: Final[WeakKeyDictionary[type, Optional[_Handler]]] = (
+    WeakKeyDictionary()
+)
+
+
+def _lookup_handler(cls: type) -> Optional[_Handler]:
+    """Find handler for subclassed node types (e.g. `str` subclasses)"""
+    # Resolved once per class, like `functools.singledispatch` dispatch cache
+    if cls in _SUBCLASS_HANDLERS:
+        return _SUBCLASS_HANDLERS[cls]
+
+    handler = None
+    for base in cls.__mro__[1:]:
+        handler = _HANDLERS.get(base)
+        if handler is not None:
+            break
+    _SUBCLASS_HANDLERS[cls] = handler
+    return handler
 
 
 class Options(TypedDict, total=False):
@@ -237,12 +453,15 @@ def write_gtkw_file(
         root_module:    Root module name to use
         kwargs:         Various options (see `Options`)
     """
-    with open(file_name, "wt", encoding="utf-8") as fjel:
-        gtkw = GTKWSave(fjel)
+    # Render in memory and write out at once (avoids many small encoded writes)
+    buf = io.StringIO()
+    gtkw = GTKWSave(buf)
+
+    if source_file is not None:
+        gtkw.comment(f"Auto-generated from {source_file}")
+    gtkw.dumpfile(str(vcd_file), kwargs.get("vcd_abs", True))
+    gtkw.zoom_markers(zoom, marker, kwargs=kwargs.get("named_markers", dict()))
 
-        if source_file is not None:
-            gtkw.comment(f"Auto-generated from {source_file}")
-        gtkw.dumpfile(str(vcd_file), kwargs.get("vcd_abs", True))
-        gtkw.zoom_markers(zoom, marker, kwargs=kwargs.get("named_markers", dict()))
+    _traverse_dom(gtkw, traces, root_style, root_module, dict())
 
-        _traverse_dom(gtkw, traces, root_style, root_module)
+    Path(file_name).write_text(buf.getvalue(), encoding="utf-8")